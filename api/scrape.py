@@ -5,58 +5,121 @@ Returns JSON: { "tracks": [...], "playlistName": "..." }
 """
 from __future__ import annotations
 
-import json
 import re
 from http.server import BaseHTTPRequestHandler
 
+import lxml.html
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Reused across fetches so repeat requests skip the TCP/TLS handshake.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    "User-Agent": (
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    )
+})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+))
+
+# Built once at import and reused for every page (and, on Vercel, across warm
+# invocations). Apple Music serves UTF-8, so the raw bytes are parsed as-is.
+_HTML_PARSER = lxml.html.HTMLParser(encoding="utf-8", remove_comments=True)
+
+# Compiled once at import; each returns a list of strings, not elements.
+_XP_SCRIPTS = etree.XPath("//script/text()", smart_strings=False)
+_XP_META_SONG = etree.XPath('//meta[@property="music:song"]/@content[. != ""]', smart_strings=False)
+_XP_OG_TITLE = etree.XPath('//meta[@property="og:title"]/@content[. != ""]', smart_strings=False)
+_XP_TITLE = etree.XPath("//title/text()", smart_strings=False)
+
+_LD_RE = re.compile(
+    rb'<script[^>]*\stype=["\']?application/ld\+json["\']?[^>]*>(.*?)</script>',
+    re.DOTALL | re.IGNORECASE,
+)
+
+_CHUNK_SIZE = 64 * 1024
+_INTENT_START = b'[{"intent"'
+# Everything up to and including the next bracket, or "<", that is not inside
+# a JSON string. Inline JSON can't hold a bare "<", so one means the marker
+# was in markup or a JS string rather than the blob. Written in unrolled
+# form so a failed match stays linear.
+# Balancing brackets with it costs roughly 3x a single lazy-regex pass
+# (~38 ms vs ~11-14 ms on an 800 KB page with a 3000-track blob); it is used
+# because its state carries across chunks, which streamed parsing needs.
+_TO_BRACKET_RE = re.compile(
+    rb'[^"\[\]{}<]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}<]*)*[\[\]{}<]', re.DOTALL
+)
 
 
 def scrape_apple_music_playlist(url: str) -> tuple[list[dict], str]:
     """Scrape song titles/artists and playlist name from a public Apple Music playlist page."""
-    headers = {
-        "User-Agent": (
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/120.0.0.0 Safari/537.36"
-        )
-    }
-    resp = requests.get(url, headers=headers, timeout=30)
-    resp.raise_for_status()
-
-    soup = BeautifulSoup(resp.text, "html.parser")
+    # Strategy 1: Scan the raw bytes for the serialized [{"intent" blob while
+    # the page streams in; the full DOM is only built when this fails.
+    content, tracks = _fetch_and_extract_intent_blobs(url)
+    if tracks:
+        # Only the playlist name is still needed. Its title and meta tags live
+        # in <head>, so only that part of the page is parsed.
+        return tracks, _extract_playlist_name(_parse_head(content))
+
+    tree = _parse_html(content)
+    if tree is None:
+        return [], ""
 
     # Extract playlist name from the page title or meta tags
-    playlist_name = _extract_playlist_name(soup)
+    playlist_name = _extract_playlist_name(tree)
 
-    # Strategy 1: Look for serialized server data in script tags.
-    tracks = _extract_from_serialized_data(soup)
+    # Strategy 1b: A script whose entire content is serialized JSON.
+    tracks = _extract_from_serialized_data(tree)
     if tracks:
         return tracks, playlist_name
 
     # Strategy 2: Look for JSON-LD structured data.
-    tracks = _extract_from_json_ld(soup)
+    tracks = _extract_from_json_ld(content)
     if tracks:
         return tracks, playlist_name
 
     # Strategy 3: Parse meta / schema markup as fallback.
-    tracks = _extract_from_meta_tags(soup)
+    tracks = _extract_from_meta_tags(tree)
     return tracks, playlist_name
 
 
-def _extract_playlist_name(soup: BeautifulSoup) -> str:
+def _parse_html(content: bytes) -> lxml.html.HtmlElement | None:
+    """Parse page bytes with the shared parser, or None if there is no document."""
+    try:
+        return lxml.html.fromstring(content, parser=_HTML_PARSER)
+    except etree.ParserError:
+        # Empty, whitespace-only or comment-only page.
+        return None
+
+
+def _parse_head(content: bytes) -> lxml.html.HtmlElement | None:
+    """Parse only the document head, up to the closing </head> tag."""
+    end = content.find(b"</head>")
+    return _parse_html(content if end == -1 else content[:end])
+
+
+def _extract_playlist_name(tree: lxml.html.HtmlElement | None) -> str:
     """Extract the playlist name from the page."""
+    if tree is None:
+        return ""
+
     # Try og:title meta tag
-    og_title = soup.find("meta", attrs={"property": "og:title"})
-    if og_title and og_title.get("content"):
-        return og_title["content"]
+    og_titles = _XP_OG_TITLE(tree)
+    if og_titles:
+        return og_titles[0]
 
     # Try the page title
-    title_tag = soup.find("title")
-    if title_tag and title_tag.string:
+    for text in _XP_TITLE(tree):
         # Apple Music titles are usually "Playlist Name - Apple Music"
-        title = title_tag.string.strip()
+        title = text.strip()
         if " - " in title:
             return title.rsplit(" - ", 1)[0].strip()
         return title
@@ -64,75 +127,159 @@ def _extract_playlist_name(soup: BeautifulSoup) -> str:
     return ""
 
 
-def _extract_from_serialized_data(soup: BeautifulSoup) -> list[dict]:
-    """Extract tracks from the serialized JSON blob Apple Music embeds."""
+class _IntentBlobScanner:
+    """
+    Incrementally find [{"intent"...}] arrays in a page fed chunk by chunk.
+
+    From each start marker, brackets are balanced forward (skipping JSON
+    strings whole) until the array closes: one linear pass, with no
+    backtracking and no assumption about what follows the array. A bare "<"
+    abandons the candidate, since the marker was then in markup or a JS
+    string rather than inline JSON. Scan state
+    survives between chunks, so markers, strings and arrays may straddle
+    chunk boundaries. The full page is kept in buf for the fallbacks.
+    """
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0
+        self.start = -1
+        self.depth = 0
+
+    def feed(self, chunk: bytes) -> list[bytes]:
+        """Append chunk and return the blobs completed by it."""
+        self.buf += chunk
+        blobs = []
+        while True:
+            if self.start == -1:
+                start = self.buf.find(_INTENT_START, self.pos)
+                if start == -1:
+                    # Rescan the tail next time in case the marker is split.
+                    self.pos = max(self.pos, len(self.buf) - len(_INTENT_START) + 1)
+                    return blobs
+                self.start = self.pos = start
+                self.depth = 0
+
+            match = _TO_BRACKET_RE.match(self.buf, self.pos)
+            if match is None:
+                # The next bracket (or the end of a string) hasn't arrived yet.
+                return blobs
+            self.pos = match.end()
+            char = self.buf[self.pos - 1]
+            if char == ord("<"):
+                # Not inline JSON; look for the next marker after this one.
+                self.pos = self.start + 1
+                self.start = -1
+            elif char in b"[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    blobs.append(bytes(self.buf[self.start:self.pos]))
+                    self.start = -1
+
+
+def _fetch_and_extract_intent_blobs(url: str) -> tuple[bytes, list[dict]]:
+    """
+    Download the page, extracting tracks from [{"intent"...}] blobs as they arrive.
+
+    Each blob is decoded and walked as soon as its closing bracket is read, so
+    parsing overlaps the rest of the download. Returns the page bytes and the
+    tracks found.
+    """
+    scanner = _IntentBlobScanner()
     tracks = []
+    # requests advertises and transparently decodes gzip (and br when brotli
+    # is installed), chunk by chunk.
+    with _SESSION.get(url, timeout=30, stream=True) as resp:
+        resp.raise_for_status()
+        for chunk in resp.iter_content(_CHUNK_SIZE):
+            for raw in scanner.feed(chunk):
+                try:
+                    blob = orjson.loads(raw)
+                except orjson.JSONDecodeError:
+                    continue
+                _walk_intent_blob(blob, tracks)
+    return bytes(scanner.buf), tracks
 
-    for script in soup.find_all("script"):
-        text = script.string
-        if not text:
-            continue
-
-        json_blobs = []
-
-        for match in re.finditer(r'\[{"intent".*?\}\](?=\s*<)', text, re.DOTALL):
-            try:
-                json_blobs.append(json.loads(match.group()))
-            except json.JSONDecodeError:
-                continue
 
-        if not json_blobs:
-            stripped = text.strip()
-            if stripped.startswith("[") or stripped.startswith("{"):
-                try:
-                    data = json.loads(stripped)
-                    json_blobs.append(data if isinstance(data, list) else [data])
-                except json.JSONDecodeError:
-                    pass
+def _extract_from_serialized_data(tree: lxml.html.HtmlElement) -> list[dict]:
+    """Extract tracks from script tags whose entire content is JSON."""
+    tracks = []
 
-        for blob in json_blobs:
-            _walk_json_for_tracks(blob, tracks)
+    for text in _XP_SCRIPTS(tree):
+        # Most scripts are plain JS; a prefix check skips them cheaply.
+        if text.lstrip()[:1] not in ("[", "{"):
+            continue
+        try:
+            data = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            continue
+        _walk_json_for_tracks(data if isinstance(data, list) else [data], tracks)
 
     return tracks
 
 
-def _walk_json_for_tracks(obj, tracks: list[dict]):
-    """Recursively walk a JSON structure to find track-lockup items."""
-    if isinstance(obj, dict):
-        obj_id = obj.get("id", "")
-        title = obj.get("title")
-        subtitle_links = obj.get("subtitleLinks")
-
-        if "track-lockup" in str(obj_id) and title and subtitle_links:
-            artist = ""
-            if isinstance(subtitle_links, list) and subtitle_links:
-                artist = subtitle_links[0].get("title", "")
-            tracks.append({"title": title, "artist": artist})
+def _walk_intent_blob(blob, tracks: list[dict]):
+    """
+    Collect tracks from one decoded [{"intent"...}] blob.
+
+    Apple Music keeps the track list under each entry's data.sections, so only
+    those subtrees are walked first; the whole blob is walked if they are
+    missing or hold no tracks.
+    """
+    sections = [
+        entry["data"]["sections"]
+        for entry in blob
+        if isinstance(entry, dict)
+        and isinstance(entry.get("data"), dict)
+        and isinstance(entry["data"].get("sections"), list)
+    ]
+    if sections:
+        found = len(tracks)
+        _walk_json_for_tracks(sections, tracks)
+        if len(tracks) > found:
             return
-
-        if obj.get("itemKind") == "trackLockup" and title:
-            artist = ""
-            if isinstance(subtitle_links, list) and subtitle_links:
-                artist = subtitle_links[0].get("title", "")
-            if artist or title:
-                tracks.append({"title": title, "artist": artist})
-                return
-
-        for value in obj.values():
-            _walk_json_for_tracks(value, tracks)
-
-    elif isinstance(obj, list):
-        for item in obj:
-            _walk_json_for_tracks(item, tracks)
-
-
-def _extract_from_json_ld(soup: BeautifulSoup) -> list[dict]:
+    _walk_json_for_tracks(blob, tracks)
+
+
+def _walk_json_for_tracks(root, tracks: list[dict]):
+    """Walk a JSON structure to find track-lockup items, in document order."""
+    # Explicit stack instead of recursion: no per-node call overhead and no
+    # RecursionError on deeply nested blobs. Children are pushed in reverse
+    # so tracks still come out in playlist order.
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if isinstance(obj, dict):
+            # Every track entry has a title, so most nodes stop after one lookup.
+            title = obj.get("title")
+            if title:
+                subtitle_links = obj.get("subtitleLinks")
+                obj_id = obj.get("id")
+                if (
+                    subtitle_links and isinstance(obj_id, str) and "track-lockup" in obj_id
+                ) or obj.get("itemKind") == "trackLockup":
+                    artist = ""
+                    if isinstance(subtitle_links, list) and subtitle_links:
+                        artist = subtitle_links[0].get("title", "")
+                    tracks.append({"title": title, "artist": artist})
+                    continue
+
+            # Only containers can hold tracks; leaf values are never pushed.
+            stack.extend(v for v in reversed(obj.values()) if isinstance(v, (dict, list)))
+
+        elif isinstance(obj, list):
+            stack.extend(v for v in reversed(obj) if isinstance(v, (dict, list)))
+
+
+def _extract_from_json_ld(content: bytes) -> list[dict]:
     """Extract tracks from JSON-LD structured data if present."""
     tracks = []
-    for script in soup.find_all("script", type="application/ld+json"):
+    for match in _LD_RE.finditer(content):
         try:
-            data = json.loads(script.string)
-        except (json.JSONDecodeError, TypeError):
+            data = orjson.loads(match.group(1))
+        except orjson.JSONDecodeError:
             continue
 
         if isinstance(data, dict) and data.get("@type") == "MusicPlaylist":
@@ -149,14 +296,9 @@ def _extract_from_json_ld(soup: BeautifulSoup) -> list[dict]:
     return tracks
 
 
-def _extract_from_meta_tags(soup: BeautifulSoup) -> list[dict]:
+def _extract_from_meta_tags(tree: lxml.html.HtmlElement) -> list[dict]:
     """Fallback: extract whatever we can from meta tags."""
-    tracks = []
-    for meta in soup.find_all("meta", attrs={"property": "music:song"}):
-        content = meta.get("content", "")
-        if content:
-            tracks.append({"title": content, "artist": ""})
-    return tracks
+    return [{"title": content, "artist": ""} for content in _XP_META_SONG(tree)]
 
 
 class handler(BaseHTTPRequestHandler):
@@ -169,7 +311,7 @@ class handler(BaseHTTPRequestHandler):
         try:
             content_length = int(self.headers.get("Content-Length", 0))
             body = self.rfile.read(content_length)
-            data = json.loads(body)
+            data = orjson.loads(body)
             url = data.get("url", "")
 
             if not url or "music.apple.com" not in url:
@@ -201,7 +343,7 @@ class handler(BaseHTTPRequestHandler):
         self._set_cors_headers()
         self.send_header("Content-Type", "application/json")
         self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
+        self.wfile.write(orjson.dumps(data))
 
     def _set_cors_headers(self):
         self.send_header("Access-Control-Allow-Origin", "*")
@@ -4,12 +4,13 @@
  */
 export function normalize(s: string): string {
   let result = s.toLowerCase().trim();
-  // Remove feat./ft./featuring in parentheses/brackets
-  result = result.replace(/\s*[(\[](feat\.?|ft\.?|featuring).*?[)\]]/g, "");
-  // Remove feat./ft./featuring and everything after
-  result = result.replace(/\s*(feat\.?|ft\.?|featuring)\s+.*$/g, "");
+  // Remove feat./ft./featuring in parentheses/brackets, or bare and everything after
+  result = result.replace(
+    /\s*(?:[(\[](?:feat\.?|ft\.?|featuring).*?[)\]]|(?:feat\.?|ft\.?|featuring)\s+.*$)/g,
+    ""
+  );
   // Normalize apostrophes
-  result = result.replace(/[''`]/g, "'");
+  result = result.replace(/[\u2018\u2019`]/g, "'");
   // Collapse whitespace
   result = result.replace(/\s+/g, " ");
   return result.trim();